@@ -0,0 +1 @@
+# מאפשר ל-pytest לייבא את המודולים שבשורש הריפו (looz, update_headers) מתוך tests/
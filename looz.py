@@ -4,6 +4,9 @@ import numpy as np
 import io
 import traceback
 import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import xlsxwriter
 
 # --- בדיקת ספריית ג'מיני ---
 try:
@@ -96,15 +99,17 @@ def preprocess_courses(df):
         else: df[col] = None
     return df
 
+def find_lecturer_col(columns):
+    for col in columns:
+        if str(col).strip() == "שם מלא": return col
+    for col in columns:
+        if "שם" in str(col) or "מרצה" in str(col): return col
+    return None
+
 def preprocess_availability(df):
     df = df.dropna(how='all')
     df.columns = df.columns.str.strip()
-    lecturer_col = None
-    for col in df.columns:
-        if str(col).strip() == "שם מלא": lecturer_col = col; break
-    if not lecturer_col:
-        for col in df.columns:
-            if "שם" in str(col) or "מרצה" in str(col): lecturer_col = col; break
+    lecturer_col = find_lecturer_col(df.columns)
     if not lecturer_col: st.error("No 'Full Name' column found in availability file."); return None, None
     df = df.rename(columns={lecturer_col: 'Lecturer'})
     df['Lecturer'] = df['Lecturer'].apply(safe_str)
@@ -126,6 +131,95 @@ def preprocess_availability(df):
         sparsity[lec] = count
     return avail_db, sparsity
 
+# --- קליטה ישירה מגיליון התשובות (Google Sheet) ---
+
+SHEET_LAST_COL = "ZZ"
+
+def normalize_lecturer(val):
+    lec = safe_str(val)
+    return " ".join(lec.split()) if lec else None
+
+def new_avail_snapshot():
+    # rows/stamps ממופים לפי מספר השורה בגיליון; avail_db/sparsity הם המטמון הממוזג
+    return {'header': None, 'rows': {}, 'stamps': {}, 'avail_db': {}, 'sparsity': {}}
+
+def fetch_changed_responses(worksheet, snapshot):
+    """קריאה מרוכזת אחת: כותרות, עמודת חותמת הזמן והשורות החדשות בלבד.
+    שורות קיימות שחותמת הזמן שלהן השתנתה (עריכת תשובה) נמשכות בקריאה מרוכזת נוספת."""
+    n = len(snapshot['rows'])
+    header_rng, stamps_rng, new_rng = worksheet.batch_get(
+        ["1:1", "A2:A", f"A{n + 2}:{SHEET_LAST_COL}"])
+    header = [str(h).strip() for h in (header_rng[0] if header_rng else [])]
+    stamps = [r[0] if r else "" for r in stamps_rng]
+
+    if snapshot['header'] is not None and header != snapshot['header']:
+        # מבנה הגיליון השתנה - טעינה מלאה מחדש
+        snapshot.update(new_avail_snapshot())
+        n = 0
+        new_rng = worksheet.get(f"A2:{SHEET_LAST_COL}")
+    snapshot['header'] = header
+
+    changed = {}
+    for i, values in enumerate(new_rng):
+        changed[n + 2 + i] = list(values)
+    edited = [r for r, ts in snapshot['stamps'].items()
+              if (stamps[r - 2] if r - 2 < len(stamps) else "") != ts]
+    if edited:
+        for r, rng in zip(edited, worksheet.batch_get([f"A{r}:{SHEET_LAST_COL}{r}" for r in edited])):
+            changed[r] = list(rng[0]) if rng else []
+    for r in changed:
+        snapshot['stamps'][r] = stamps[r - 2] if r - 2 < len(stamps) else ""
+    return header, changed
+
+def merge_availability_rows(snapshot, header, changed):
+    """מעבד מחדש רק את המרצים שהשורות שלהם נוספו/השתנו וממזג אל avail_db/sparsity השמורים."""
+    lecturer_col = find_lecturer_col(header)
+    if not lecturer_col: st.error("No 'Full Name' column found in availability sheet."); return False
+    lec_idx = header.index(lecturer_col)
+    row_lecturer = lambda vals: normalize_lecturer(vals[lec_idx]) if lec_idx < len(vals) else None
+
+    affected = set()
+    for r, values in changed.items():
+        old = snapshot['rows'].get(r)
+        if old is not None: affected.add(row_lecturer(old))
+        affected.add(row_lecturer(values))
+        snapshot['rows'][r] = values
+    affected.discard(None)
+    if not affected: return True
+
+    avail_db, sparsity = snapshot['avail_db'], snapshot['sparsity']
+    for lec in affected:
+        avail_db.pop(lec, None)
+        sparsity.pop(lec, None)
+    width = len(header)
+    subset = [(vals + [""] * width)[:width] for _, vals in sorted(snapshot['rows'].items())
+              if row_lecturer(vals) in affected]
+    if subset:
+        db, sp = preprocess_availability(pd.DataFrame(subset, columns=header))
+        if db is None: return False
+        avail_db.update(db)
+        sparsity.update(sp)
+    return True
+
+def sync_availability_snapshot(worksheet, snapshot):
+    header, changed = fetch_changed_responses(worksheet, snapshot)
+    if not merge_availability_rows(snapshot, header, changed): return None, None
+    return snapshot['avail_db'], snapshot['sparsity']
+
+def load_availability_from_sheet(sheet_url, full_reload=False):
+    from update_headers import get_gspread_client
+    client = get_gspread_client()
+    if not client: return None, None
+    try:
+        worksheet = client.open_by_url(sheet_url).get_worksheet(0)
+    except Exception as e:
+        st.error(f"Error opening availability sheet: {e}")
+        return None, None
+    if "avail_snapshots" not in st.session_state: st.session_state.avail_snapshots = {}
+    if full_reload or sheet_url not in st.session_state.avail_snapshots:
+        st.session_state.avail_snapshots[sheet_url] = new_avail_snapshot()
+    return sync_availability_snapshot(worksheet, st.session_state.avail_snapshots[sheet_url])
+
 # ================= 3. SCHEDULER ENGINE =================
 
 class Scheduler:
@@ -148,13 +242,14 @@ class Scheduler:
         if day not in self.busy[year][sem]: self.busy[year][sem][day] = {}
         self.busy[year][sem][day][h] = True
 
-    def run(self, shuffle=False):
-        self.courses['Lecturer'] = self.courses['Lecturer'].apply(lambda x: " ".join(str(x).split()))
+    def run(self, shuffle=False, seed=None):
+        # assign ולא השמה במקום - טבלת הקורסים עשויה להיות משותפת בין תרחישים
+        self.courses = self.courses.assign(Lecturer=self.courses['Lecturer'].apply(lambda x: " ".join(str(x).split())))
         df = self.courses.copy()
         df['Sparsity'] = df['Lecturer'].map(self.sparsity).fillna(0).astype(int)
         wave_hard = df[df['LinkID'].notna() | df['FixDay'].notna() | df['FixHour'].notna()]
         wave_soft = df[~df.index.isin(wave_hard.index)]
-        if shuffle: wave_soft = wave_soft.sample(frac=1).reset_index(drop=True)
+        if shuffle: wave_soft = wave_soft.sample(frac=1, random_state=seed).reset_index(drop=True)
         else: wave_soft = wave_soft.sort_values(by=['Sparsity', 'Duration'], ascending=[True, False])
         waves = [wave_hard, wave_soft]
         self.schedule = []
@@ -221,7 +316,296 @@ class Scheduler:
         for item in group:
             self.errors.append({'Course': item.get('Course'), 'Lecturer': item.get('Lecturer'), 'Reason': reason, 'LinkID': item.get('LinkID')})
 
-# ================= 4. CHAT FUNCTIONS =================
+def find_best_schedule(courses, avail_db, sparsity, iterations=30, on_progress=None, seed=None):
+    best_sched = pd.DataFrame(); best_errors = pd.DataFrame(); min_errors = float('inf')
+    for i in range(iterations + 1):
+        if on_progress: on_progress(i / (iterations + 1))
+        sched = Scheduler(courses, avail_db, sparsity)
+        s, e = sched.run(shuffle=(i > 0), seed=None if seed is None else seed + i)
+        if len(e) < min_errors:
+            min_errors = len(e); best_sched = s; best_errors = e
+            if min_errors == 0: break
+    return best_sched, best_errors
+
+def schedule_quality(sched, errors):
+    if sched.empty: return {'Scheduled': 0, 'Failed': len(errors), 'Gaps': 0, 'LateHours': 0}
+    scheduled = len(sched.drop_duplicates(subset=['Course', 'Lecturer']))
+    # חלונות: שעות ריקות בין השיעור הראשון לאחרון של כל שנתון ביום
+    slots = sched.dropna(subset=['Year']).drop_duplicates(subset=['Year', 'Semester', 'Day', 'Hour'])
+    span = slots.groupby(['Year', 'Semester', 'Day'])['Hour'].agg(['min', 'max', 'count'])
+    gaps = int((span['max'] - span['min'] + 1 - span['count']).sum())
+    late = int((sched['Hour'] >= 18).sum())
+    return {'Scheduled': scheduled, 'Failed': len(errors), 'Gaps': gaps, 'LateHours': late}
+
+# --- בדיקה עצמאית של מערכת מוכנה (גם כזו שנערכה ידנית) מול האילוצים הקשיחים ---
+
+SCHEDULE_COLS = ['Year', 'Semester', 'Day', 'Hour', 'Course', 'Lecturer', 'Space', 'LinkID']
+VIOLATION_COLS = ['Check', 'Course', 'Lecturer', 'Year', 'Semester', 'Day', 'Hour', 'Detail']
+COURSE_KEY = ['Course', 'Lecturer', 'Year']
+SLOT = ['Semester', 'Day', 'Hour']
+
+def _norm_year(val):
+    s = safe_str(val)
+    if s is None: return None
+    try:
+        f = float(s)
+        return str(int(f)) if f.is_integer() else s
+    except ValueError: return s
+
+def _normalize_keys(df):
+    # קובץ שהועלה מחדש מגיע עם טיפוסים/רווחים שונים - מיישרים את המפתחות בשני הצדדים.
+    # object גם כשהטבלה ריקה (מערכת ריקה מגיעה כ-float), אחרת ה-merge נכשל על טיפוסים
+    return df.assign(Course=df['Course'].apply(safe_str), Lecturer=df['Lecturer'].apply(normalize_lecturer),
+                     Year=df['Year'].apply(_norm_year), LinkID=df['LinkID'].apply(safe_str)
+                     ).astype({'Course': object, 'Lecturer': object, 'Year': object, 'LinkID': object})
+
+def availability_frame(avail_db):
+    rows = [(lec, sem, day, h) for lec, sems in avail_db.items()
+            for sem, days in sems.items() for day, hours in days.items() for h in hours]
+    return pd.DataFrame(rows, columns=['Lecturer'] + SLOT).astype({c: int for c in SLOT})
+
+def verify_schedule(sched, courses, avail_db):
+    """מחזיר טבלת הפרות (ריקה = תקין): כפל שיבוץ מרצה, התנגשות שנתון, חוסר זמינות,
+    יישור LinkID, FixDay/FixHour ושלמות משך הקורס."""
+    found = []
+    def report(check, rows, detail):
+        if not rows.empty: found.append(rows.assign(Check=check, Detail=detail).reindex(columns=VIOLATION_COLS))
+
+    s = _normalize_keys(sched.reindex(columns=SCHEDULE_COLS))
+    for col in SLOT: s[col] = pd.to_numeric(s[col], errors='coerce')
+    bad = s[SLOT].isna().any(axis=1) | s['Course'].isna() | s['Lecturer'].isna()
+    report('Invalid Row', s[bad], "שורה חסרה או לא תקינה")
+    s = s[~bad].astype({c: int for c in SLOT})
+
+    # קורסים מקושרים (LinkID) משובצים יחד ונחשבים יחידה אחת בשתי הבדיקות הבאות
+    unit = s['LinkID'].where(s['LinkID'].notna(), s['Course'].astype(str) + "|" + s['Lecturer'].astype(str))
+
+    # כפל שיבוץ של מרצה
+    units = unit.groupby([s['Lecturer']] + [s[c] for c in SLOT]).transform('nunique')
+    report('Lecturer Double-Booked', s[units > 1], "למרצה יותר משיעור אחד באותה שעה")
+
+    # התנגשות שנתון
+    has_year = s['Year'].notna()
+    y = s[has_year]
+    units = unit[has_year].groupby([y['Year']] + [y[c] for c in SLOT]).transform('nunique')
+    report('Student Clash', y[units > 1], "לשנתון יותר משיעור אחד באותה שעה")
+
+    # זמינות מרצה
+    m = s.merge(availability_frame(avail_db).assign(_ok=True), on=['Lecturer'] + SLOT, how='left')
+    report('Unavailable', m[m['_ok'].isna()], "המרצה אינו זמין בשעה זו")
+
+    # יישור LinkID - כל חברי הקישור באותן משבצות בדיוק
+    linked = s[s['LinkID'].notna()].drop_duplicates(subset=COURSE_KEY + ['LinkID'] + SLOT)
+    union = linked.drop_duplicates(subset=['LinkID'] + SLOT).groupby('LinkID').size()
+    member = linked.groupby(COURSE_KEY + ['LinkID'], dropna=False)['Hour'].transform('size')
+    expected = linked['LinkID'].map(union)
+    report('LinkID Misaligned', linked[member < expected],
+           "שובץ ב-" + member.astype(str) + " מתוך " + expected.astype(str) + " משבצות הקישור")
+
+    # בלוקים: רצף שעות צמודות של אותו קורס באותו יום. שורות קורס זהות (כמה קבוצות
+    # של אותו קורס/מרצה/שנתון) משובצות כבלוקים נפרדים, ולכן כל בלוק נבדק לעצמו
+    b = s.drop_duplicates(subset=COURSE_KEY + SLOT).sort_values(COURSE_KEY + SLOT)
+    prev = b.shift()
+    same_key = (b[COURSE_KEY].eq(prev[COURSE_KEY]) | (b[COURSE_KEY].isna() & prev[COURSE_KEY].isna())).all(axis=1)
+    same_run = same_key & (b['Semester'] == prev['Semester']) & (b['Day'] == prev['Day']) & (b['Hour'] == prev['Hour'] + 1)
+    b = b.assign(_block=(~same_run).cumsum())
+    blocks = b.drop_duplicates('_block')
+    blocks = blocks.assign(Hours=blocks['_block'].map(b['_block'].value_counts()))
+
+    c = _normalize_keys(courses.reindex(columns=COURSE_KEY + ['LinkID', 'Semester', 'Duration', 'FixDay', 'FixHour']))
+    wanted = c.groupby(COURSE_KEY, dropna=False).agg(
+        Duration=('Duration', 'sum'), Rows=('Duration', 'size'), CourseSemester=('Semester', 'first')).reset_index()
+    got = blocks.groupby(COURSE_KEY, dropna=False).agg(
+        Semester=('Semester', 'first'), Day=('Day', 'first'), Hour=('Hour', 'first'),
+        Hours=('Hours', 'sum'), Blocks=('Hours', 'size')).reset_index()
+    m = wanted.merge(got, on=COURSE_KEY, how='outer', indicator=True)
+    missing = m[m['_merge'] == 'left_only']
+    report('Unscheduled', missing.assign(Semester=missing['CourseSemester']), "הקורס לא שובץ כלל")
+    report('Unknown Course', m[m['_merge'] == 'right_only'], "הקורס אינו מופיע בטבלת הקורסים")
+    m = m[m['_merge'] == 'both']
+    # קבוצות סמוכות מתמזגות לבלוק אחד, לכן מותר פחות בלוקים משורות אבל לא יותר
+    broken = (m['Hours'] != m['Duration']) | (m['Blocks'] > m['Rows'])
+    report('Duration', m[broken], m['Hours'].astype(int).astype(str) + "/" + m['Duration'].astype(int).astype(str)
+           + " שעות ב-" + m['Blocks'].astype(int).astype(str) + " בלוקים (נדרש בלוק רציף לכל שורת קורס)")
+
+    # FixDay/FixHour לכל בלוק - רק לקורסים שכל השורות שלהם מקובעות; בין קבוצות עם אילוצים שונים מספיק התאמה לאחד
+    for col, slot_col, text in [('FixDay', 'Day', "נדרש יום "), ('FixHour', 'Hour', "נדרשת שעת התחלה ")]:
+        all_fixed = c[col].notna().groupby([c[k] for k in COURSE_KEY], dropna=False).transform('all')
+        allowed = c[all_fixed & c[col].notna()]
+        allowed = allowed.assign(**{slot_col: allowed[col].astype(int)})[COURSE_KEY + [slot_col]].drop_duplicates()
+        required = allowed.groupby(COURSE_KEY, dropna=False)[slot_col].agg(
+            lambda v: ",".join(str(x) for x in sorted(v))).rename('_required').reset_index()
+        hit = blocks.merge(required, on=COURSE_KEY).merge(allowed.assign(_ok=True), on=COURSE_KEY + [slot_col], how='left')
+        bad = hit[hit['_ok'].isna()]
+        report(col, bad, text + bad['_required'].astype(str))
+
+    if not found: return pd.DataFrame(columns=VIOLATION_COLS)
+    return pd.concat(found, ignore_index=True).astype({c: 'Int64' for c in SLOT})
+
+# ================= 4. WHAT-IF SCENARIOS =================
+# תרחיש הוא מילון:
+#   {'name': 'X מוסיף יום רביעי',
+#    'avail':   [(lecturer, semester, day, hours, 'add' / 'remove'), ...],   hours=None ב-remove = כל היום
+#    'courses': [({'Course': 'Y'}, {'Semester': 2, 'FixDay': None}), ...]}  התאמה -> עדכון
+# התרחישים מוחלים כשכבות copy-on-write מעל בסיס משותף שעובד פעם אחת בלבד.
+
+BASELINE_NAME = "בסיס"
+
+def overlay_availability(avail_db, sparsity, edits):
+    if not edits: return avail_db, sparsity
+    for lec, sem, day, hours, op in edits:
+        if op not in ('add', 'remove'): raise ValueError(f"Unknown availability op {op!r} for {lec} (expected 'add' or 'remove').")
+        if hours is None and op == 'add': raise ValueError(f"Availability 'add' for {lec} needs explicit hours.")
+    db = dict(avail_db); sp = dict(sparsity)
+    copied = set()  # רק הענפים שנערכים מועתקים, השאר משותפים עם הבסיס
+    for lec, sem, day, hours, op in edits:
+        lec = normalize_lecturer(lec); sem = int(sem); day = int(day)
+        if lec not in copied: db[lec] = dict(db.get(lec, {})); copied.add(lec)
+        if (lec, sem) not in copied: db[lec][sem] = dict(db[lec].get(sem, {})); copied.add((lec, sem))
+        if (lec, sem, day) not in copied: db[lec][sem][day] = set(db[lec][sem].get(day, set())); copied.add((lec, sem, day))
+        slot = db[lec][sem][day]
+        before = len(slot)
+        if op == 'add': slot.update(hours)
+        elif hours is None: slot.clear()
+        else: slot.difference_update(hours)
+        sp[lec] = sp.get(lec, 0) + len(slot) - before
+    return db, sp
+
+def _course_value(col, val):
+    # אותו נרמול כמו preprocess_courses, כדי ש-1 / 'א' / 1.0 בתרחיש יתאימו לערכים בטבלה
+    if col in ('FixDay', 'FixHour'): return pd.NA if val is None or pd.isna(val) else int(val)
+    if col == 'Semester': return clean_semester(val)
+    if col == 'Duration': return int(val)
+    if col == 'Year': return _norm_year(val)
+    if col == 'Lecturer': return normalize_lecturer(val)
+    return safe_str(val)
+
+def overlay_courses(courses, edits):
+    if not edits: return courses
+    for match, updates in edits:
+        unknown = [col for col in [*match, *updates] if col not in courses.columns]
+        if unknown: raise ValueError(f"Unknown course column(s) in scenario: {', '.join(map(str, unknown))}.")
+    df = courses.copy()
+    for match, updates in edits:
+        mask = pd.Series(True, index=df.index)
+        for col, val in match.items():
+            val = _course_value(col, val)
+            column = df[col].map(lambda v: _course_value(col, v)) if col in ('Year', 'Lecturer') else df[col]
+            mask &= column.isna() if val is None or val is pd.NA else column.eq(val).fillna(False).astype(bool)
+        if not mask.any(): raise ValueError(f"Scenario course edit {match} matches no courses.")
+        for col, val in updates.items():
+            df.loc[mask, col] = _course_value(col, val)
+    return df
+
+_scenario_baseline = None
+
+def _init_scenario_worker(baseline):
+    global _scenario_baseline
+    _scenario_baseline = baseline
+
+def run_scenario(scenario, baseline=None, iterations=30, seed=0):
+    base = baseline if baseline is not None else _scenario_baseline
+    # התרחיש חל על טבלת הקורסים המלאה; סינון מרצים ללא זמינות רק אחרי שכבת הזמינות,
+    # כך שמרצה שחסר בבסיס ומקבל שעות בתרחיש נכנס לשיבוץ
+    courses = overlay_courses(base.get('all_courses', base['courses']), scenario.get('courses'))
+    avail_db, sparsity = overlay_availability(base['avail_db'], base['sparsity'], scenario.get('avail'))
+    courses = courses[courses['Lecturer'].isin(avail_db.keys())]
+    sched, errors = find_best_schedule(courses, avail_db, sparsity, iterations, seed=seed)
+    violations = verify_schedule(sched, courses, avail_db)
+    quality = {**schedule_quality(sched, errors), 'Violations': int((violations['Check'] != 'Unscheduled').sum())}
+    return {'Scenario': scenario.get('name'), **quality}, sched, errors
+
+def run_scenarios(baseline, scenarios, iterations=30, max_workers=None, seed=0):
+    """מריץ את הבסיס ואת כל התרחישים (במקביל) ומחזיר טבלת השוואה + את השיבוצים עצמם.
+    baseline = {'courses', 'all_courses', 'avail_db', 'sparsity'} כפי שמחזירה prepare_inputs.
+    הבסיס נשלח לכל תהליך פעם אחת; לכל משימה נשלחת רק שכבת השינויים."""
+    all_scenarios = [{'name': BASELINE_NAME}] + list(scenarios)
+    names = [sc.get('name') for sc in all_scenarios]
+    duplicates = sorted({str(n) for n in names if names.count(n) > 1})
+    if duplicates: raise ValueError(f"Scenario names must be unique and differ from {BASELINE_NAME!r}: {', '.join(duplicates)}.")
+    if max_workers == 1 or len(all_scenarios) == 1:
+        results = [run_scenario(sc, baseline, iterations, seed) for sc in all_scenarios]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_scenario_worker, initargs=(baseline,)) as pool:
+            results = list(pool.map(run_scenario, all_scenarios, repeat(None), repeat(iterations), repeat(seed)))
+    table = pd.DataFrame([r[0] for r in results])
+    for col in ['Scheduled', 'Failed', 'Gaps', 'LateHours', 'Violations']:
+        table[f'Δ{col}'] = table[col] - table[col].iloc[0]
+    return table, {r[0]['Scenario']: (r[1], r[2]) for r in results}
+
+# ================= 5. EXCEL EXPORT =================
+
+DAY_NAMES = {1: 'ראשון', 2: 'שני', 3: 'שלישי', 4: 'רביעי', 5: 'חמישי', 6: 'שישי', 7: 'שבת'}
+GRID_HOURS = range(8, 22)
+
+def schedule_grids(sched, key, label):
+    """מעבר pivot יחיד על כל השיבוץ: שורה לכל (key, סמסטר, שעה), עמודה לכל יום."""
+    df = sched.assign(Label=label).dropna(subset=[key])
+    return df.pivot_table(index=[key, 'Semester', 'Hour'], columns='Day', values='Label',
+                          aggfunc=lambda s: "\n".join(dict.fromkeys(s)))
+
+def _sheet_name(name, used):
+    # מגבלות אקסל: עד 31 תווים, ללא []:*?/\, לא להתחיל/להסתיים בגרש, ושמות ייחודיים
+    base = "".join(ch for ch in str(name) if ch not in '[]:*?/\\')[:31].strip("'") or "Sheet"
+    sheet, i = base, 2
+    while sheet.lower() in used:
+        suffix = f" ({i})"; sheet = base[:31 - len(suffix)] + suffix; i += 1
+    used.add(sheet.lower())
+    return sheet
+
+def _write_grid_sheet(workbook, formats, name, grid, days):
+    ws = workbook.add_worksheet(name)
+    ws.right_to_left()
+    ws.set_column(0, 0, 8)
+    ws.set_column(1, len(days), 24, formats['cell'])
+    r = 0
+    # constant_memory: כתיבה שורה אחר שורה, לפי הסדר
+    for sem, block in grid.groupby(level='Semester', sort=True):
+        ws.write_row(r, 0, [f"סמסטר {sem}"], formats['title']); r += 1
+        ws.write_row(r, 0, ["שעה"] + [DAY_NAMES.get(d, d) for d in days], formats['header']); r += 1
+        rows = block.droplevel(['Semester']).to_dict('index')
+        for h in GRID_HOURS:
+            cells = rows.get(h, {})
+            ws.write(r, 0, f"{h:02d}:00", formats['header'])
+            for c, d in enumerate(days, start=1):
+                val = cells.get(d)
+                if isinstance(val, str): ws.write_string(r, c, val, formats['cell'])
+            r += 1
+        r += 1
+
+def export_schedule_xlsx(sched, errors):
+    """חוברת Excel: גיליון מערכת שבועית לכל שנתון ולכל מרצה + גיליון שגיאות, בכתיבה זורמת."""
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    formats = {
+        'title': workbook.add_format({'bold': True, 'font_size': 13}),
+        'header': workbook.add_format({'bold': True, 'bg_color': '#DDEBF7', 'border': 1, 'align': 'center'}),
+        'cell': workbook.add_format({'text_wrap': True, 'valign': 'top', 'border': 1}),
+    }
+    used = set()
+    if not sched.empty:
+        sched = sched.assign(Year=sched['Year'].map(_norm_year))  # שנה שנקראה כ-float: 1.0 -> '1'
+        days = sorted(set([1, 2, 3, 4, 5]) | set(sched['Day'].astype(int)))
+        course = sched['Course'].astype(str)
+        year_label = course + " (" + sched['Lecturer'].astype(str) + ")"
+        lec_label = course + sched['Year'].map(lambda y: f" (שנה {y})" if y else "")
+        for key, prefix, label in [('Year', "שנה ", year_label), ('Lecturer', "", lec_label)]:
+            grids = schedule_grids(sched, key, label)
+            for name, grid in grids.groupby(level=key, sort=True):
+                _write_grid_sheet(workbook, formats, _sheet_name(f"{prefix}{name}", used),
+                                  grid.droplevel(key), days)
+
+    ws = workbook.add_worksheet(_sheet_name("שגיאות", used))
+    ws.right_to_left()
+    if not errors.empty:
+        ws.set_column(0, len(errors.columns) - 1, 24)
+        ws.write_row(0, 0, list(errors.columns), formats['header'])
+        for r, values in enumerate(errors.itertuples(index=False), start=1):
+            ws.write_row(r, 0, ["" if pd.isna(v) else v for v in values])
+    workbook.close()
+    return output.getvalue()
+
+# ================= 6. CHAT FUNCTIONS =================
 
 def init_chat_session(schedule_df, errors_df, api_key):
     """גרסה חכמה שמוצאת מודל זמין באופן אוטומטי למניעת 404"""
@@ -265,7 +649,41 @@ def init_chat_session(schedule_df, errors_df, api_key):
 
     except Exception as e:
         print(f"DEBUG: Dynamic discovery failed: {e}")
-        return None# ================= 5. MAIN =================
+        return None# ================= 7. MAIN =================
+
+def prepare_inputs(courses_file, avail_file):
+    """טעינה ועיבוד מקדים של הקבצים; מחזיר {'courses', 'all_courses', 'avail_db', 'sparsity'} או None.
+    courses מסונן למרצים שיש להם זמינות, all_courses הוא הטבלה המלאה (לתרחישים)."""
+    c_raw = load_uploaded_file(courses_file)
+    if c_raw is None: return None
+
+    # avail_file יכול להיות קובץ שהועלה או קישור לגיליון התשובות
+    if isinstance(avail_file, str):
+        avail_db, sparsity = load_availability_from_sheet(avail_file)
+    else:
+        a_raw = load_uploaded_file(avail_file)
+        if a_raw is None: return None
+        avail_db, sparsity = preprocess_availability(a_raw)
+    if not avail_db: return None
+
+    courses = preprocess_courses(c_raw)
+    if courses.empty:
+        st.error("Courses file invalid.")
+        return None
+
+    courses['Lecturer'] = courses['Lecturer'].apply(lambda x: " ".join(str(x).split()))
+    valid_lecs = set(avail_db.keys())
+    mask = courses['Lecturer'].isin(valid_lecs)
+
+    if not mask.all():
+        missing = courses[~mask]['Lecturer'].unique()
+        st.warning(f"⚠️ {len(missing)} מרצים חסרים בקובץ הזמינות.")
+
+    final_courses = courses[mask].copy()
+    if final_courses.empty:
+        st.error("אין קורסים לשיבוץ.")
+        return None
+    return {'courses': final_courses, 'all_courses': courses, 'avail_db': avail_db, 'sparsity': sparsity}
 
 def main_process(courses_file, avail_file, iterations=30):
     if not courses_file or not avail_file: return
@@ -287,45 +705,21 @@ def main_process(courses_file, avail_file, iterations=30):
     st.info("🔄 טוען נתונים...")
     
     try:
-        c_raw = load_uploaded_file(courses_file)
-        a_raw = load_uploaded_file(avail_file)
-        if c_raw is None or a_raw is None: return
-        
-        avail_db, sparsity = preprocess_availability(a_raw)
-        if not avail_db: return
-        
-        courses = preprocess_courses(c_raw)
-        if courses.empty:
-            st.error("Courses file invalid.")
-            return
-
-        courses['Lecturer'] = courses['Lecturer'].apply(lambda x: " ".join(str(x).split()))
-        valid_lecs = set(avail_db.keys())
-        mask = courses['Lecturer'].isin(valid_lecs)
-        
-        if not mask.all():
-            missing = courses[~mask]['Lecturer'].unique()
-            st.warning(f"⚠️ {len(missing)} מרצים חסרים בקובץ הזמינות.")
-            
-        final_courses = courses[mask].copy()
-        if final_courses.empty:
-            st.error("אין קורסים לשיבוץ.")
-            return
+        baseline = prepare_inputs(courses_file, avail_file)
+        if baseline is None: return
 
         st.success(f"✅ מבצע שיבוץ ({iterations} איטרציות)...")
-        best_sched = pd.DataFrame(); best_errors = pd.DataFrame(); min_errors = float('inf')
         bar = st.progress(0)
-        
-        for i in range(iterations + 1):
-            bar.progress(i/(iterations+1))
-            sched = Scheduler(final_courses, avail_db, sparsity)
-            s, e = sched.run(shuffle=(i > 0))
-            
-            if len(e) < min_errors:
-                min_errors = len(e); best_sched = s; best_errors = e
-                if min_errors == 0: break
-        
+        best_sched, best_errors = find_best_schedule(
+            baseline['courses'], baseline['avail_db'], baseline['sparsity'], iterations, on_progress=bar.progress)
         bar.empty()
+
+        # כשלונות כבר מופיעים בקובץ השגיאות - כאן רק הפרות בפועל
+        violations = verify_schedule(best_sched, baseline['courses'], baseline['avail_db'])
+        violations = violations[violations['Check'] != 'Unscheduled']
+        if not violations.empty:
+            st.warning(f"⚠️ נמצאו {len(violations)} הפרות אילוצים במערכת שנבנתה:")
+            st.dataframe(violations)
         
         st.divider()
         c1, c2 = st.columns(2)
@@ -336,12 +730,23 @@ def main_process(courses_file, avail_file, iterations=30):
         if not best_sched.empty:
             st.dataframe(best_sched)
             st.download_button("📥 הורד מערכת", best_sched.to_csv(index=False).encode('utf-8-sig'), "schedule.csv")
+            st.download_button("📊 הורד מערכות שבועיות (Excel)", export_schedule_xlsx(best_sched, best_errors), "schedule.xlsx")
             
         if not best_errors.empty:
             st.error("פירוט שגיאות:")
             st.dataframe(best_errors)
             st.download_button("⚠️ הורד קובץ שגיאות", best_errors.to_csv(index=False).encode('utf-8-sig'), "errors.csv")
 
+        with st.expander("🔎 בדיקת מערכת שנערכה ידנית"):
+            edited_file = st.file_uploader("העלה מערכת (Excel/CSV)", type=['xlsx', 'csv'], key="edited_sched")
+            edited = load_uploaded_file(edited_file)
+            if edited is not None:
+                report = verify_schedule(edited, baseline['courses'], baseline['avail_db'])
+                if report.empty: st.success("✅ המערכת עומדת בכל האילוצים.")
+                else:
+                    st.error(f"נמצאו {len(report)} הפרות:")
+                    st.dataframe(report)
+
         st.divider()
         st.subheader("💬 ניתוח תוצאות עם בינה מלאכותית")
 
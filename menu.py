@@ -65,7 +65,12 @@ if action == "בנה לי מערכת (LOOZ)":
             
         with col2:
             st.markdown("### 2. קובץ זמינות")
-            avail_file = st.file_uploader("העלה קובץ (Excel/CSV)", type=['xlsx', 'csv'], key="avail")
+            avail_source = st.radio("מקור הזמינות:", ["קובץ", "גיליון תשובות (Google Sheet)"], horizontal=True, key="avail_source")
+            if avail_source == "קובץ":
+                avail_file = st.file_uploader("העלה קובץ (Excel/CSV)", type=['xlsx', 'csv'], key="avail")
+            else:
+                # קריאה ישירה מהגיליון; טעינות חוזרות מושכות רק תשובות חדשות/שנערכו
+                avail_file = st.text_input("קישור לגיליון התשובות:", key="avail_url").strip() or None
 
         st.markdown("<br>", unsafe_allow_html=True)
         
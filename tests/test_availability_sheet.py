@@ -0,0 +1,105 @@
+import re
+
+import pandas as pd
+import pytest
+
+import looz
+
+HEADER = ["Timestamp", "שם מלא", "11", "21", "12"]
+
+
+class FakeWorksheet:
+    """גיליון תשובות מקומי: מבין רק את טווחי ה-A1 ש-looz מבקש ורושם כל קריאה."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def _read(self, rng):
+        if rng == "1:1": return [list(self.rows[0])]
+        if rng == "A2:A": return [[r[0]] if r[0] else [] for r in self.rows[1:]]
+        m = re.fullmatch(r"A(\d+):ZZ(\d+)?", rng)
+        lo = int(m.group(1)); hi = int(m.group(2)) if m.group(2) else len(self.rows)
+        return [list(r) for r in self.rows[lo - 1:hi]]
+
+    def batch_get(self, ranges):
+        self.calls.append(("batch_get", list(ranges)))
+        return [self._read(r) for r in ranges]
+
+    def get(self, rng):
+        self.calls.append(("get", rng))
+        return self._read(rng)
+
+
+def full_preprocess(rows):
+    width = len(rows[0])
+    body = [(list(r) + [""] * width)[:width] for r in rows[1:]]
+    return looz.preprocess_availability(pd.DataFrame(body, columns=rows[0]))
+
+
+def sync(ws, snapshot):
+    ws.calls.clear()
+    return looz.sync_availability_snapshot(ws, snapshot)
+
+
+@pytest.fixture
+def rows():
+    return [list(HEADER),
+            ["t1", "Dan  Cohen", "8-12", "", ""],
+            ["t2", "Rina", "10-12", "9-11;14-16", ""],
+            ["t3", "Dan Cohen", "", "", "8-10"]]
+
+
+def test_initial_load_matches_full_preprocess(rows):
+    ws = FakeWorksheet(rows)
+    snapshot = looz.new_avail_snapshot()
+    assert sync(ws, snapshot) == full_preprocess(rows)
+    assert ws.calls == [("batch_get", ["1:1", "A2:A", "A2:ZZ"])]
+
+
+def test_unchanged_sheet_reads_no_rows(rows):
+    ws = FakeWorksheet(rows)
+    snapshot = looz.new_avail_snapshot()
+    sync(ws, snapshot)
+    assert sync(ws, snapshot) == full_preprocess(rows)
+    assert ws.calls == [("batch_get", ["1:1", "A2:A", "A5:ZZ"])]
+
+
+def test_appended_and_edited_rows_are_merged(rows):
+    ws = FakeWorksheet(rows)
+    snapshot = looz.new_avail_snapshot()
+    sync(ws, snapshot)
+    rows.append(["t4", "Yossi", "8-9", "", ""])
+    rows[2] = ["t2-edit", "Rina", "12-14", "", ""]
+    assert sync(ws, snapshot) == full_preprocess(rows)
+    # רק השורות החדשות והשורה שנערכה נקראות
+    assert ws.calls == [("batch_get", ["1:1", "A2:A", "A5:ZZ"]), ("batch_get", ["A3:ZZ3"])]
+
+
+def test_edit_that_renames_lecturer_drops_old_entry(rows):
+    ws = FakeWorksheet(rows)
+    snapshot = looz.new_avail_snapshot()
+    sync(ws, snapshot)
+    rows[2] = ["t2-edit", "Rina Levi", "8-10", "", ""]
+    avail_db, sparsity = sync(ws, snapshot)
+    assert "Rina" not in avail_db and "Rina" not in sparsity
+    assert (avail_db, sparsity) == full_preprocess(rows)
+
+
+def test_deleted_row_shifts_are_refetched(rows):
+    ws = FakeWorksheet(rows)
+    snapshot = looz.new_avail_snapshot()
+    sync(ws, snapshot)
+    del rows[1]
+    assert sync(ws, snapshot) == full_preprocess(rows)
+    assert ws.calls == [("batch_get", ["1:1", "A2:A", "A5:ZZ"]),
+                        ("batch_get", ["A2:ZZ2", "A3:ZZ3", "A4:ZZ4"])]
+
+
+def test_header_change_forces_full_reload(rows):
+    ws = FakeWorksheet(rows)
+    snapshot = looz.new_avail_snapshot()
+    sync(ws, snapshot)
+    rows[0] = ["Timestamp", "שם מלא", "11", "21", "22"]
+    assert sync(ws, snapshot) == full_preprocess(rows)
+    assert ws.calls == [("batch_get", ["1:1", "A2:A", "A5:ZZ"]), ("get", "A2:ZZ")]
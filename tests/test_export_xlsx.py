@@ -0,0 +1,49 @@
+import io
+
+import openpyxl
+import pandas as pd
+
+import looz
+
+
+def rows(course, lecturer, year, day, hours):
+    return [{'Year': year, 'Semester': 1, 'Day': day, 'Hour': h, 'Course': course,
+             'Lecturer': lecturer, 'Space': None, 'LinkID': None} for h in hours]
+
+
+def open_workbook(sched, errors):
+    return openpyxl.load_workbook(io.BytesIO(looz.export_schedule_xlsx(sched, errors)))
+
+
+def test_sheets_and_grid_cells():
+    # Year כ-float כמו אחרי קריאת CSV עם ערכים חסרים
+    sched = pd.DataFrame(rows('Algebra', "'Ali", 1.0, 1, [9, 10]) + rows('Bio', "סאמר ג'", 2.0, 3, [8])
+                         + rows('Seminar', 'Rina', None, 2, [12]))
+    errors = pd.DataFrame([{'Course': 'Chem', 'Lecturer': 'Rina', 'Reason': 'No Time Slot Found', 'LinkID': None}])
+    wb = open_workbook(sched, errors)
+
+    assert wb.sheetnames == ['שנה 1', 'שנה 2', 'Ali', 'Rina', 'סאמר ג', 'שגיאות']
+    year1 = wb['שנה 1']
+    assert year1['A1'].value == 'סמסטר 1'
+    assert [c.value for c in year1[2]] == ['שעה', 'ראשון', 'שני', 'שלישי', 'רביעי', 'חמישי']
+    assert year1['A4'].value == '09:00'
+    assert year1['B4'].value == "Algebra ('Ali)"
+    assert year1['B3'].value is None
+    assert wb['סאמר ג']['D3'].value == 'Bio (שנה 2)'
+    assert wb['Rina']['C7'].value == 'Seminar'
+    assert [c.value for c in wb['שגיאות'][2]] == ['Chem', 'Rina', 'No Time Slot Found', None]
+
+
+def test_sheet_name_rules():
+    used = set()
+    assert looz._sheet_name("'" + "a" * 29 + "'", used) == "a" * 29
+    # החיתוך ל-31 תווים משאיר גרש בסוף
+    assert looz._sheet_name("a" * 30 + "'xyz", used) == "a" * 30
+    assert looz._sheet_name("'" + "a" * 30, used) == "a" * 27 + " (2)"
+    assert looz._sheet_name("'''", used) == "Sheet"
+    assert looz._sheet_name("x[1]:y/z", used) == "x1yz"
+
+
+def test_empty_schedule_has_only_errors_sheet():
+    wb = open_workbook(pd.DataFrame(), pd.DataFrame())
+    assert wb.sheetnames == ['שגיאות']
@@ -0,0 +1,91 @@
+import copy
+
+import pandas as pd
+import pytest
+
+import looz
+
+
+@pytest.fixture
+def baseline():
+    courses = looz.preprocess_courses(pd.DataFrame({
+        'מרצה': ['Dan', 'Rina', 'Rina', 'Nadav'],
+        'שם קורס': ['Algebra', 'Bio', 'Chem', 'Physics'],
+        'שעות': [2, 3, 2, 2],
+        'סמסטר': ['א', 'א', 'ב', 'א'],
+        'שנה': [1, 1, 2, 2],
+    }))
+    avail_db, sparsity = looz.preprocess_availability(pd.DataFrame({
+        'שם מלא': ['Dan', 'Rina'],
+        '11': ['8-10', '9-12'],
+        '12': ['', '10-12'],
+    }))
+    # כמו prepare_inputs: Nadav חסר בקובץ הזמינות ולכן מסונן מהבסיס
+    return {'courses': courses[courses['Lecturer'].isin(avail_db.keys())].copy(), 'all_courses': courses,
+            'avail_db': avail_db, 'sparsity': sparsity}
+
+
+def test_overlay_availability_leaves_baseline_untouched(baseline):
+    before = copy.deepcopy(baseline['avail_db']), dict(baseline['sparsity'])
+    db, sp = looz.overlay_availability(baseline['avail_db'], baseline['sparsity'],
+                                       [('Dan', 1, 3, range(8, 12), 'add'), ('Rina', 1, 1, None, 'remove')])
+    assert (baseline['avail_db'], baseline['sparsity']) == before
+    assert db['Dan'][1][3] == {8, 9, 10, 11} and db['Rina'][1][1] == set()
+    assert sp == {'Dan': 6, 'Rina': 2}
+    # ענפים שלא נערכו משותפים עם הבסיס
+    assert db['Rina'][2] is baseline['avail_db']['Rina'][2]
+
+
+@pytest.mark.parametrize("edit", [('Dan', 1, 1, None, 'add'), ('Dan', 1, 1, [8], 'delete')])
+def test_overlay_availability_rejects_bad_edits(baseline, edit):
+    with pytest.raises(ValueError):
+        looz.overlay_availability(baseline['avail_db'], baseline['sparsity'], [edit])
+
+
+def test_overlay_courses_normalizes_match_values(baseline):
+    courses = baseline['all_courses']
+    edited = looz.overlay_courses(courses, [({'Year': 1, 'Semester': 'א', 'Lecturer': ' Rina '}, {'Semester': 'ב', 'FixDay': 3})])
+    bio = edited[edited['Course'] == 'Bio'].iloc[0]
+    assert bio['Semester'] == 2 and bio['FixDay'] == 3
+    assert edited[edited['Course'] != 'Bio'].equals(courses[courses['Course'] != 'Bio'])
+    assert courses.loc[courses['Course'] == 'Bio', 'Semester'].iloc[0] == 1
+
+
+@pytest.mark.parametrize("edit", [({'Year': 3}, {'Semester': 2}), ({'Term': 1}, {'Semester': 2}), ({'Course': 'Bio'}, {'Room': 'A'})])
+def test_overlay_courses_rejects_bad_edits(baseline, edit):
+    with pytest.raises(ValueError):
+        looz.overlay_courses(baseline['all_courses'], [edit])
+
+
+def test_lecturer_missing_from_baseline_is_scheduled_when_added(baseline):
+    table, results = looz.run_scenarios(baseline, [{'name': 'Nadav joins', 'avail': [('Nadav', 1, 2, range(8, 12), 'add')]}],
+                                        iterations=2, max_workers=1)
+    base_sched, _ = results[looz.BASELINE_NAME]
+    sched, _ = results['Nadav joins']
+    assert 'Physics' not in set(base_sched['Course'])
+    assert set(sched.loc[sched['Course'] == 'Physics', 'Day']) == {2}
+    assert table.set_index('Scenario').loc['Nadav joins', 'ΔScheduled'] == 1
+
+
+def test_all_failing_scenario_does_not_abort_sweep(baseline):
+    scenarios = [{'name': 'nobody', 'avail': [(lec, 1, 1, None, 'remove') for lec in ['Dan', 'Rina']]
+                  + [('Rina', 2, 1, None, 'remove')]}]
+    table, results = looz.run_scenarios(baseline, scenarios, iterations=1, max_workers=1)
+    row = table.set_index('Scenario').loc['nobody']
+    assert results['nobody'][0].empty
+    assert row['Scheduled'] == 0 and row['Violations'] == 0
+
+
+def test_duplicate_scenario_names_are_rejected(baseline):
+    with pytest.raises(ValueError):
+        looz.run_scenarios(baseline, [{'name': looz.BASELINE_NAME}], iterations=0, max_workers=1)
+
+
+def test_process_pool_matches_sequential(baseline):
+    scenarios = [{'name': 'Dan adds Wed', 'avail': [('Dan', 1, 3, range(8, 12), 'add')]},
+                 {'name': 'Bio to sem 2', 'courses': [({'Course': 'Bio'}, {'Semester': 'ב'})]}]
+    sequential, seq_results = looz.run_scenarios(baseline, scenarios, iterations=3, max_workers=1)
+    pooled, pool_results = looz.run_scenarios(baseline, scenarios, iterations=3, max_workers=2)
+    pd.testing.assert_frame_equal(sequential, pooled)
+    for name, (sched, errors) in seq_results.items():
+        pd.testing.assert_frame_equal(sched, pool_results[name][0])
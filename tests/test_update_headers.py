@@ -0,0 +1,113 @@
+import pytest
+
+import update_headers
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, ws_id, title, header_row):
+        self.spreadsheet = spreadsheet
+        self.id = ws_id
+        self.title = title
+        self.header_row = header_row
+
+
+class FakeSpreadsheet:
+    """קובץ מקומי: values_batch_get/values_batch_update נרשמים, הכותרות נשמרות בזיכרון."""
+
+    def __init__(self, sheet_id, tabs):
+        self.id = sheet_id
+        self.title = f"book-{sheet_id}"
+        self.tabs = [FakeWorksheet(self, i, title, row) for i, (title, row) in enumerate(tabs)]
+        self.batch_gets = []
+        self.batch_updates = []
+
+    def worksheets(self): return self.tabs
+    def get_worksheet(self, index): return self.tabs[index]
+    def get_worksheet_by_id(self, ws_id): return next(w for w in self.tabs if w.id == ws_id)
+
+    def _tab(self, rng):
+        title = rng.split("!")[0][1:-1].replace("''", "'")
+        return next(w for w in self.tabs if w.title == title)
+
+    def values_batch_get(self, ranges):
+        self.batch_gets.append(list(ranges))
+        out = []
+        for rng in ranges:
+            row = self._tab(rng).header_row[1:]  # הטווח מתחיל בעמודה B
+            out.append({"range": rng, "values": [row]} if row else {"range": rng})
+        return {"valueRanges": out}
+
+    def values_batch_update(self, body):
+        self.batch_updates.append(body)
+
+
+class FakeClient:
+    def __init__(self, *spreadsheets):
+        self.by_url = {f"https://docs.google.com/spreadsheets/d/{s.id}/edit": s for s in spreadsheets}
+
+    def open_by_url(self, url):
+        return self.by_url[url.split("#")[0]]
+
+
+TARGET = update_headers.build_headers(["1", "2"])
+
+
+@pytest.fixture
+def books():
+    a = FakeSpreadsheet("A", [("Year 1", ["ts"] + TARGET[:7]), ("Year 2", ["ts"])])
+    b = FakeSpreadsheet("B", [("Form's", ["ts", "11", "x"] + TARGET[2:])])
+    return a, b
+
+
+def urls(*books):
+    return [f"https://docs.google.com/spreadsheets/d/{b.id}/edit" for b in books]
+
+
+def test_build_headers():
+    assert TARGET == ["11", "21", "31", "41", "51", "12", "22", "32", "42", "52"]
+
+
+def test_open_target_worksheets_groups_by_spreadsheet(books):
+    a, b = books
+    client = FakeClient(a, b)
+    groups = update_headers.open_target_worksheets(client, urls(a) + [urls(a)[0] + "#gid=1"] + urls(b))
+    assert {sid: [w.title for w in ws] for sid, (_, ws) in groups.items()} == {"A": ["Year 1", "Year 2"], "B": ["Form's"]}
+    groups = update_headers.open_target_worksheets(client, urls(a), all_tabs=True)
+    assert [w.title for w in groups["A"][1]] == ["Year 1", "Year 2"]
+
+
+def test_diff_and_apply_batch_per_spreadsheet(books):
+    a, b = books
+    groups = update_headers.open_target_worksheets(FakeClient(a, b), urls(a) + [urls(a)[0] + "#gid=1"] + urls(b))
+    changes = update_headers.diff_headers(groups, TARGET)
+    assert a.batch_gets == [["'Year 1'!B1:K1", "'Year 2'!B1:K1"]]
+    assert b.batch_gets == [["'Form''s'!B1:K1"]]
+    assert [(c["Worksheet"], c["Cell"], c["Old"], c["New"]) for c in changes["B"]] == [("Form's", "C1", "x", "21")]
+
+    update_headers.apply_header_changes(groups, changes)
+    assert a.batch_updates == [{"valueInputOption": "RAW", "data": [
+        {"range": "'Year 1'!I1:K1", "values": [["32", "42", "52"]]},
+        {"range": "'Year 2'!B1:K1", "values": [TARGET]},
+    ]}]
+    assert b.batch_updates == [{"valueInputOption": "RAW", "data": [
+        {"range": "'Form''s'!C1:C1", "values": [["21"]]},
+    ]}]
+
+
+def test_up_to_date_spreadsheet_is_not_written(books):
+    a, _ = books
+    a.tabs[0].header_row = ["ts"] + TARGET
+    groups = update_headers.open_target_worksheets(FakeClient(a), urls(a))
+    changes = update_headers.diff_headers(groups, TARGET)
+    update_headers.apply_header_changes(groups, changes)
+    assert changes == {"A": []}
+    assert a.batch_updates == []
+
+
+@pytest.mark.parametrize("dry_run, expected_updates", [(True, 0), (False, 1)])
+def test_batch_logic_dry_run(monkeypatch, books, dry_run, expected_updates):
+    a, b = books
+    monkeypatch.setattr(update_headers, "get_gspread_client", lambda: FakeClient(a, b))
+    update_headers.update_headers_batch_logic("\n".join(urls(a, b)), "1, 2", all_tabs=True, dry_run=dry_run)
+    assert len(a.batch_gets) == 1 and len(b.batch_gets) == 1
+    assert len(a.batch_updates) == expected_updates and len(b.batch_updates) == expected_updates
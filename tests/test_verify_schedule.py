@@ -0,0 +1,141 @@
+import io
+
+import pandas as pd
+import pytest
+
+import looz
+
+
+@pytest.fixture
+def courses():
+    return looz.preprocess_courses(pd.DataFrame({
+        'מרצה': ['Dan', 'Rina', 'Yossi', 'Yossi', 'Dan', 'Dan'],
+        'שם קורס': ['Algebra', 'Bio', 'Stats', 'Stats', 'Calc', 'Calc'],
+        'שעות': [2, 2, 2, 2, 2, 2],
+        'סמסטר': ['א', 'א', 'א', 'א', 'א', 'א'],
+        'קישור': [None, None, 'S1', 'S1', None, None],
+        'אילוץ יום': [1, None, None, None, None, None],
+        'אילוץ שעה': [8, None, None, None, None, None],
+        'שנה': ['1', '1', '1', '2', '2', '2'],
+    }))
+
+
+@pytest.fixture
+def avail_db():
+    avail_db, _ = looz.preprocess_availability(pd.DataFrame({
+        'שם מלא': ['Dan', 'Rina', 'Yossi'],
+        '11': ['8-14', '8-12', '8-12'],
+        '21': ['8-12', '8-12', ''],
+        '31': ['8-12', '', ''],
+    }))
+    return avail_db
+
+
+def rows(course, lecturer, year, day, hours, link=None):
+    return [{'Year': year, 'Semester': 1, 'Day': day, 'Hour': h, 'Course': course,
+             'Lecturer': lecturer, 'Space': None, 'LinkID': link} for h in hours]
+
+
+@pytest.fixture
+def valid():
+    # Stats היא שיעור משותף לשני שנתונים; Calc הן שתי קבוצות צמודות של אותו קורס
+    return pd.DataFrame(
+        rows('Algebra', 'Dan', '1', 1, [8, 9]) + rows('Stats', 'Yossi', '1', 1, [10, 11], 'S1')
+        + rows('Stats', 'Yossi', '2', 1, [10, 11], 'S1') + rows('Bio', 'Rina', '1', 2, [8, 9])
+        + rows('Calc', 'Dan', '2', 2, [8, 9]) + rows('Calc', 'Dan', '2', 2, [10, 11]))
+
+
+def checks(sched, courses, avail_db):
+    return set(looz.verify_schedule(sched, courses, avail_db)['Check'])
+
+
+def move(sched, course, **changes):
+    sched = sched.copy()
+    for col, val in changes.items():
+        sched.loc[sched['Course'] == course, col] = val
+    return sched
+
+
+def test_valid_schedule_has_no_violations(valid, courses, avail_db):
+    report = looz.verify_schedule(valid, courses, avail_db)
+    assert report.empty
+    assert list(report.columns) == looz.VIOLATION_COLS
+
+
+def test_empty_schedule_reports_only_unscheduled(courses, avail_db):
+    report = looz.verify_schedule(pd.DataFrame(), courses, avail_db)
+    assert set(report['Check']) == {'Unscheduled'}
+    assert len(report) == len(courses.drop_duplicates(subset=looz.COURSE_KEY))
+
+
+def test_scheduler_output_is_valid(courses, avail_db):
+    sparsity = {lec: 1 for lec in avail_db}
+    sched, errors = looz.find_best_schedule(courses, avail_db, sparsity, iterations=0)
+    assert errors.empty
+    assert looz.verify_schedule(sched, courses, avail_db).empty
+
+
+def test_nothing_placed_scheduler_output(courses):
+    sched, errors = looz.find_best_schedule(courses, {}, {}, iterations=0)
+    assert sched.empty and not errors.empty
+    assert set(looz.verify_schedule(sched, courses, {})['Check']) == {'Unscheduled'}
+
+
+def test_csv_round_trip_is_still_valid(valid, courses, avail_db):
+    reloaded = pd.read_csv(io.StringIO(valid.to_csv(index=False)))
+    assert looz.verify_schedule(reloaded, courses, avail_db).empty
+
+
+def test_invalid_row(valid, courses, avail_db):
+    broken = pd.concat([valid, pd.DataFrame(rows('Bio', 'Rina', '1', 2, [None]))], ignore_index=True)
+    assert checks(broken, courses, avail_db) == {'Invalid Row'}
+
+
+def test_lecturer_double_booked(valid, courses, avail_db):
+    broken = valid.copy()
+    broken.loc[(broken['Course'] == 'Calc') & (broken['Hour'] < 10), 'Day'] = 1
+    report = looz.verify_schedule(broken, courses, avail_db)
+    assert set(report['Check']) == {'Lecturer Double-Booked'}
+    assert set(report['Course']) == {'Algebra', 'Calc'}
+
+
+def test_student_clash(valid, courses, avail_db):
+    broken = move(valid, 'Bio', Day=1, Hour=[10, 11])
+    report = looz.verify_schedule(broken, courses, avail_db)
+    assert set(report['Check']) == {'Student Clash'}
+    assert set(report['Course']) == {'Bio', 'Stats'}
+
+
+def test_unavailable(valid, courses, avail_db):
+    assert checks(move(valid, 'Bio', Day=3), courses, avail_db) == {'Unavailable'}
+
+
+def test_linkid_misaligned(valid, courses, avail_db):
+    broken = valid.drop(valid.index[(valid['Year'] == '2') & (valid['Course'] == 'Stats') & (valid['Hour'] == 11)])
+    assert checks(broken, courses, avail_db) == {'LinkID Misaligned', 'Duration'}
+
+
+def test_unscheduled_and_unknown_course(valid, courses, avail_db):
+    broken = pd.concat([valid[valid['Course'] != 'Bio'], pd.DataFrame(rows('Physics', 'Rina', '3', 2, [10]))])
+    report = looz.verify_schedule(broken, courses, avail_db)
+    assert set(zip(report['Check'], report['Course'])) == {('Unscheduled', 'Bio'), ('Unknown Course', 'Physics')}
+
+
+def test_duration(valid, courses, avail_db):
+    broken = valid.drop(valid.index[(valid['Course'] == 'Bio') & (valid['Hour'] == 9)])
+    assert checks(broken, courses, avail_db) == {'Duration'}
+
+
+def test_split_block_is_a_duration_violation(valid, courses, avail_db):
+    broken = move(valid, 'Bio', Hour=[8, 10])
+    assert checks(broken, courses, avail_db) == {'Duration'}
+
+
+def test_fix_day(valid, courses, avail_db):
+    assert checks(move(valid, 'Algebra', Day=3), courses, avail_db) == {'FixDay'}
+
+
+def test_fix_hour(valid, courses, avail_db):
+    report = looz.verify_schedule(move(valid, 'Algebra', Hour=[12, 13]), courses, avail_db)
+    assert set(report['Check']) == {'FixHour'}
+    assert report['Detail'].tolist() == ["נדרשת שעת התחלה 8"]
@@ -1,5 +1,7 @@
+import re
 import streamlit as st
 import gspread
+from gspread.utils import rowcol_to_a1, absolute_range_name
 from google.oauth2.service_account import Credentials
 
 # --- לוגיקה (פונקציות עזר) ---
@@ -24,6 +26,10 @@ def get_gspread_client():
         st.error(f"שגיאה ביצירת הרשאות: {e}")
         return None
 
+def build_headers(semesters):
+    # הפורמט: {יום}{סמסטר}, למשל 12 = יום ראשון בסמסטר 2
+    return [f"{day}{sem}" for sem in semesters for day in range(1, 6)]
+
 def update_headers_logic(sheet_url, semesters_str):
     client = get_gspread_client()
     if not client: return
@@ -40,12 +46,7 @@ def update_headers_logic(sheet_url, semesters_str):
             return
 
         # יצירת הכותרות
-        new_headers = []
-        for sem in semesters:
-            for day in range(1, 6):
-                # הפורמט: 1 [2]
-                header_name = f"{day}{sem}"
-                new_headers.append(header_name)
+        new_headers = build_headers(semesters)
 
         st.info(f"✅ עומד לעדכן {len(new_headers)} עמודות.")
         
@@ -63,11 +64,108 @@ def update_headers_logic(sheet_url, semesters_str):
     except Exception as e:
         st.error(f"❌ שגיאה: {e}")
 
+# --- מצב מרוכז: מספר גיליונות / לשוניות ---
+def open_target_worksheets(client, targets, all_tabs=False):
+    """targets: קישורים (אפשר עם gid=) או אובייקטי Worksheet.
+    מחזיר {spreadsheet_id: (spreadsheet, [worksheets])} - קיבוץ לפי קובץ לצורך קריאה/כתיבה מרוכזת."""
+    groups = {}
+    for target in targets:
+        if isinstance(target, str):
+            sheet = client.open_by_url(target)
+            gid = re.search(r"[#&?]gid=(\d+)", target)
+            if all_tabs: worksheets = sheet.worksheets()
+            elif gid: worksheets = [sheet.get_worksheet_by_id(int(gid.group(1)))]
+            else: worksheets = [sheet.get_worksheet(0)]
+        else:
+            sheet, worksheets = target.spreadsheet, [target]
+        _, known = groups.setdefault(sheet.id, (sheet, []))
+        for ws in worksheets:
+            if all(ws.id != w.id for w in known): known.append(ws)
+    return groups
+
+def diff_headers(groups, new_headers, start_col=2):
+    """קריאה מרוכזת אחת לכל קובץ של שורת הכותרות בכל הלשוניות שלו.
+    מחזיר {spreadsheet_id: [שינוי, ...]} רק עבור תאים ששונים מהיעד."""
+    last_col = start_col + len(new_headers) - 1
+    header_range = f"{rowcol_to_a1(1, start_col)}:{rowcol_to_a1(1, last_col)}"
+    changes = {}
+    for sid, (sheet, worksheets) in groups.items():
+        resp = sheet.values_batch_get([absolute_range_name(ws.title, header_range) for ws in worksheets])
+        changes[sid] = []
+        for ws, value_range in zip(worksheets, resp.get('valueRanges', [])):
+            current = (value_range.get('values') or [[]])[0]
+            for i, new in enumerate(new_headers):
+                old = str(current[i]).strip() if i < len(current) else ""
+                if old != new:
+                    changes[sid].append({'Spreadsheet': sheet.title, 'Worksheet': ws.title,
+                                         'Cell': rowcol_to_a1(1, start_col + i), 'Column': start_col + i,
+                                         'Old': old, 'New': new})
+    return changes
+
+def apply_header_changes(groups, changes):
+    """batch_update יחיד לכל קובץ; תאים סמוכים באותה לשונית נכתבים כטווח אחד."""
+    for sid, items in changes.items():
+        if not items: continue
+        runs = []
+        for item in items:
+            if runs and runs[-1][0] == item['Worksheet'] and runs[-1][1] + len(runs[-1][2]) == item['Column']:
+                runs[-1][2].append(item['New'])
+            else:
+                runs.append((item['Worksheet'], item['Column'], [item['New']]))
+        data = [{'range': absolute_range_name(title, f"{rowcol_to_a1(1, col)}:{rowcol_to_a1(1, col + len(values) - 1)}"),
+                 'values': [values]} for title, col, values in runs]
+        groups[sid][0].values_batch_update({'valueInputOption': 'RAW', 'data': data})
+
+def update_headers_batch_logic(targets_str, semesters_str, all_tabs=False, dry_run=True):
+    targets = [t.strip() for t in targets_str.splitlines() if t.strip()]
+    semesters = [s.strip() for s in semesters_str.split(',') if s.strip()]
+    if not targets or not semesters:
+        st.warning("⚠️ יש להזין לפחות קישור אחד וסמסטר אחד.")
+        return
+
+    client = get_gspread_client()
+    if not client: return
+
+    try:
+        with st.spinner("⏳ קורא את שורות הכותרות מכל הגיליונות..."):
+            groups = open_target_worksheets(client, targets, all_tabs)
+            changes = diff_headers(groups, build_headers(semesters))
+
+        rows = [{k: v for k, v in item.items() if k != 'Column'} for items in changes.values() for item in items]
+        n_tabs = sum(len(ws) for _, ws in groups.values())
+        if not rows:
+            st.success(f"✅ כל הכותרות ב-{n_tabs} הלשוניות כבר מעודכנות.")
+            return
+
+        st.info(f"נמצאו {len(rows)} תאים לעדכון ב-{n_tabs} לשוניות:")
+        st.dataframe(rows)
+        if dry_run: return
+
+        with st.spinner("⏳ מעדכן..."):
+            apply_header_changes(groups, changes)
+        st.success(f"🎉 עודכנו {len(rows)} תאים ב-{len(groups)} קבצים.")
+        st.balloons()
+
+    except Exception as e:
+        st.error(f"❌ שגיאה: {e}")
+
 # --- הפונקציה הראשית שהתפריט יפעיל ---
 def run():
     st.header("🛠️ עדכון כותרות בגיליון ציונים")
     st.markdown("כלי זה משנה את שמות העמודות בגיליון (החל מעמודה 2) לפי הסמסטרים המוזנים.")
 
+    mode = st.radio("מצב עבודה:", ["גיליון יחיד", "מספר גיליונות (מרוכז)"], horizontal=True)
+    if mode == "מספר גיליונות (מרוכז)":
+        with st.form("batch_update_form"):
+            targets_input = st.text_area("קישורים לגיליונות (קישור בכל שורה):")
+            semesters_input = st.text_input("סמסטרים (מופרדים בפסיק):", value="2,3")
+            all_tabs = st.checkbox("כל הלשוניות בכל קובץ")
+            dry_run = st.checkbox("הצג הבדלים בלבד (ללא עדכון)", value=True)
+            submitted = st.form_submit_button("הרץ עדכון 🚀")
+        if submitted:
+            update_headers_batch_logic(targets_input, semesters_input, all_tabs, dry_run)
+        return
+
     with st.form("update_form"):
         # כאן שמתי את הקישור שלך כברירת מחדל כדי לחסוך לך זמן
         url_input = st.text_input(